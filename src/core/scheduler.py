@@ -0,0 +1,298 @@
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import BrokenExecutor, Future, ProcessPoolExecutor, wait
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterator, Optional, Sequence, Tuple
+
+# --- Configuration ---
+# Environment overrides for the values derived from the container limits
+MEMORY_BUDGET_ENV = "ADOBE_MEMORY_BUDGET_MB"
+MAX_WORKERS_ENV = "ADOBE_MAX_WORKERS"
+
+# Share of the container memory limit we allow ourselves to plan against
+MEMORY_BUDGET_FRACTION = 0.75
+# Rough memory held by the sentence transformer model and torch runtime
+MODEL_RESERVE_BYTES = 512 * 1024 * 1024
+# Per-document cost estimate: fixed overhead plus a multiple of the PDF size,
+# since the span dictionaries are much larger than the compressed file
+DOCUMENT_BASE_BYTES = 32 * 1024 * 1024
+DOCUMENT_SIZE_FACTOR = 20
+# Upper bound on parsing worker processes
+MAX_PARSE_WORKERS = 8
+
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+MIB = 1024 * 1024
+
+
+def _read_text(path: Path) -> Optional[str]:
+    try:
+        return path.read_text().strip()
+    except OSError:
+        return None
+
+
+def read_cgroup_cpu_limit() -> Optional[float]:
+    """
+    Returns the CPU quota of the container in cores, or None if unlimited.
+    Supports both cgroup v2 (cpu.max) and v1 (cpu.cfs_quota_us).
+    Unreadable or malformed values are treated as unknown.
+    """
+    try:
+        cpu_max = _read_text(CGROUP_ROOT / "cpu.max")
+        if cpu_max:
+            quota, _, period = cpu_max.partition(" ")
+            if quota != "max" and period:
+                return int(quota) / int(period)
+            return None
+
+        quota = _read_text(CGROUP_ROOT / "cpu" / "cpu.cfs_quota_us")
+        period = _read_text(CGROUP_ROOT / "cpu" / "cpu.cfs_period_us")
+        if quota and period and int(quota) > 0:
+            return int(quota) / int(period)
+    except (ValueError, ZeroDivisionError):
+        pass
+    return None
+
+
+def read_cgroup_memory_limit() -> Optional[int]:
+    """
+    Returns the memory limit of the container in bytes, or None if unlimited.
+    Supports both cgroup v2 (memory.max) and v1 (memory.limit_in_bytes).
+    Unreadable or malformed values are treated as unknown.
+    """
+    try:
+        memory_max = _read_text(CGROUP_ROOT / "memory.max")
+        if memory_max:
+            return None if memory_max == "max" else int(memory_max)
+
+        limit = _read_text(CGROUP_ROOT / "memory" / "memory.limit_in_bytes")
+        # cgroup v1 reports "unlimited" as a huge page-aligned number
+        if limit and int(limit) < 1 << 60:
+            return int(limit)
+    except ValueError:
+        pass
+    return None
+
+
+def _env_positive_int(name: str) -> Optional[int]:
+    """
+    Reads a positive integer override from the environment. Invalid values
+    are reported and ignored so the derived setting is used instead.
+    """
+    value = os.environ.get(name)
+    if not value:
+        return None
+    try:
+        parsed = int(value)
+    except ValueError:
+        parsed = 0
+    if parsed <= 0:
+        print(f"Warning: ignoring {name}={value!r}, expected a positive integer.")
+        return None
+    return parsed
+
+
+def _host_cpu_count() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _host_memory_bytes() -> Optional[int]:
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+class MemoryBudget:
+    """
+    Applies backpressure to in-flight documents: callers reserve an estimated
+    number of bytes before loading a document and block until enough of the
+    budget has been released by the documents already being processed.
+    """
+
+    def __init__(self, budget_bytes: int):
+        self.budget_bytes = budget_bytes
+        self._in_use = 0
+        self._condition = threading.Condition()
+
+    def estimate(self, pdf_path: Path) -> int:
+        try:
+            size = Path(pdf_path).stat().st_size
+        except OSError:
+            size = 0
+        cost = DOCUMENT_BASE_BYTES + size * DOCUMENT_SIZE_FACTOR
+        # A single oversized document must still be able to run on its own
+        return min(cost, self.budget_bytes)
+
+    def acquire(self, cost: int) -> None:
+        """
+        Blocks until `cost` bytes fit within the budget, then reserves them.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._in_use + cost <= self.budget_bytes)
+            self._in_use += cost
+
+    def release(self, cost: int) -> None:
+        with self._condition:
+            self._in_use -= cost
+            self._condition.notify_all()
+
+    @contextmanager
+    def reserve(self, pdf_path: Path):
+        cost = self.estimate(pdf_path)
+        self.acquire(cost)
+        try:
+            yield
+        finally:
+            self.release(cost)
+
+
+@dataclass
+class ResourcePlan:
+    cpu_limit: Optional[float]
+    memory_limit_bytes: Optional[int]
+    torch_threads: int
+    parse_workers: int
+    embedding_batch_size: int
+    memory_budget: MemoryBudget
+
+    def describe(self) -> str:
+        cpu = f"{self.cpu_limit:g} cores" if self.cpu_limit else "unlimited"
+        memory = f"{self.memory_limit_bytes // MIB} MiB" if self.memory_limit_bytes else "unlimited"
+        return (
+            f"Resource plan: cpu limit={cpu}, memory limit={memory}, "
+            f"memory budget={self.memory_budget.budget_bytes // MIB} MiB, "
+            f"torch threads={self.torch_threads}, parse workers={self.parse_workers}, "
+            f"embedding batch size={self.embedding_batch_size}"
+        )
+
+
+def _embedding_batch_size(budget_bytes: int) -> int:
+    if budget_bytes < 1024 * MIB:
+        return 8
+    if budget_bytes < 4096 * MIB:
+        return 32
+    return 64
+
+
+def plan_resources(uses_model: bool = False) -> ResourcePlan:
+    """
+    Reads the container CPU and memory limits and derives thread, worker,
+    batch size and memory budget settings that stay within them.
+    """
+    cpu_limit = read_cgroup_cpu_limit()
+    memory_limit = read_cgroup_memory_limit()
+
+    cpus = _host_cpu_count()
+    if cpu_limit:
+        cpus = max(1, min(cpus, int(cpu_limit)))
+
+    # --- Memory budget ---
+    budget_mb = _env_positive_int(MEMORY_BUDGET_ENV)
+    if budget_mb:
+        budget_bytes = budget_mb * MIB
+    else:
+        available = memory_limit or _host_memory_bytes() or 2048 * MIB
+        budget_bytes = int(available * MEMORY_BUDGET_FRACTION)
+        if uses_model:
+            budget_bytes -= MODEL_RESERVE_BYTES
+    budget_bytes = max(budget_bytes, DOCUMENT_BASE_BYTES)
+
+    # --- Workers: bounded by CPUs and by how many documents fit the budget ---
+    worker_cap = _env_positive_int(MAX_WORKERS_ENV) or MAX_PARSE_WORKERS
+    parse_workers = max(1, min(cpus, worker_cap, budget_bytes // DOCUMENT_BASE_BYTES))
+
+    return ResourcePlan(
+        cpu_limit=cpu_limit,
+        memory_limit_bytes=memory_limit,
+        torch_threads=cpus,
+        parse_workers=parse_workers,
+        embedding_batch_size=_embedding_batch_size(budget_bytes),
+        memory_budget=MemoryBudget(budget_bytes),
+    )
+
+
+def _parse_context():
+    # Workers are started from a clean interpreter rather than forked, so they
+    # never inherit the model or torch's threads from the parent process. They
+    # re-import the entry point, which therefore must not load the model.
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+def _failed_future(error: BaseException) -> Future:
+    future = Future()
+    future.set_exception(error)
+    return future
+
+
+def map_documents(plan: ResourcePlan, parse: Callable, pdf_paths: Sequence[Path]) -> Iterator[Tuple[Path, Future]]:
+    """
+    Runs `parse` on each PDF in a pool of `plan.parse_workers` processes.
+    A document is only submitted once its estimated cost fits within the
+    memory budget, and its share is released when its worker returns, so
+    `parse` should return only the data the caller keeps.
+
+    Yields (pdf_path, future) pairs in input order as soon as each document
+    is done, while later documents are still being processed. Errors,
+    including a pool broken by a killed worker, are raised by
+    `future.result()` so callers can report them per document.
+    """
+    budget = plan.memory_budget
+    pending = deque()
+    broken = None
+    with ProcessPoolExecutor(max_workers=plan.parse_workers, mp_context=_parse_context()) as executor:
+        for pdf_path in pdf_paths:
+            if broken is None:
+                cost = budget.estimate(pdf_path)
+                budget.acquire(cost)
+                try:
+                    future = executor.submit(parse, pdf_path)
+                except BrokenExecutor as e:
+                    budget.release(cost)
+                    broken = e
+                except Exception:
+                    budget.release(cost)
+                    raise
+                else:
+                    future.add_done_callback(lambda _, cost=cost: budget.release(cost))
+            if broken is not None:
+                future = _failed_future(broken)
+            pending.append((pdf_path, future))
+
+            # Hand back finished documents while later ones are still queued
+            while pending and pending[0][1].done():
+                yield pending.popleft()
+
+        while pending:
+            pdf_path, future = pending.popleft()
+            wait([future])
+            yield pdf_path, future
+
+
+def apply_resource_plan(plan: ResourcePlan, uses_model: bool = False) -> None:
+    """
+    Applies the torch thread setting of the plan and logs the chosen values.
+    torch is left untouched when the caller does not run the model.
+    """
+    if uses_model:
+        import torch
+        torch.set_num_threads(plan.torch_threads)
+    print(plan.describe())
+
+
+def configure_resources(uses_model: bool = False) -> ResourcePlan:
+    """
+    Plans and applies the resource settings; called once at start-up.
+    """
+    plan = plan_resources(uses_model=uses_model)
+    apply_resource_plan(plan, uses_model=uses_model)
+    return plan
@@ -1,25 +1,21 @@
 import json
+from functools import partial
 from pathlib import Path
+from typing import Optional
+from ..core.scheduler import ResourcePlan, configure_resources, map_documents
 from ..schemas.output_schemas import Round1AOutput
 from .outline_extractor import extract_outline_from_pdf
 from .semantic_extractor import extract_semantic_info_from_pdf
 from pydantic import ValidationError
 
-def process_round1a_files(input_dir: str, output_dir: str):
-    input_path = Path(input_dir)
-    output_path = Path(output_dir)
-    output_path.mkdir(parents=True, exist_ok=True)
-
-    print(f"Processing files from: {input_path.resolve()}")
-    pdf_files = list(input_path.glob("*.pdf"))
-
-    if not pdf_files:
-        print("No PDF files found to process.")
-        return
-
-    for pdf_file in pdf_files:
-        print(f"--- Processing {pdf_file.name} ---")
+def process_pdf_file(pdf_file: Path, output_path: Path) -> str:
+    """
+    Processes a single PDF in a worker process and returns its log block, so
+    the parent can print each file's output in one piece.
+    """
+    log = [f"--- Processing {pdf_file.name} ---"]
 
+    try:
         # Step 1: Extract outline
         raw_outline = extract_outline_from_pdf(str(pdf_file))
 
@@ -38,27 +34,53 @@ def process_round1a_files(input_dir: str, output_dir: str):
             "outline": trimmed_outline
         }
 
-        try:
-            # Validate using Pydantic schema
-            validated_output = Round1AOutput(**raw_output_data)
-            print("Validation successful.")
+        # Validate using Pydantic schema
+        validated_output = Round1AOutput(**raw_output_data)
+        log.append("Validation successful.")
+
+        # Save the output
+        output_json_path = output_path / f"{pdf_file.stem}.json"
+        with open(output_json_path, "w", encoding="utf-8") as f:
+            f.write(validated_output.model_dump_json(indent=4))
+        log.append(f"Successfully created output: {output_json_path.name}")
 
-            # Save the output
-            output_json_path = output_path / f"{pdf_file.stem}.json"
-            with open(output_json_path, "w", encoding="utf-8") as f:
-                f.write(validated_output.model_dump_json(indent=4))
-            print(f"Successfully created output: {output_json_path.name}")
+    except ValidationError as e:
+        log.append(f"!!! VALIDATION FAILED for {pdf_file.name} !!!")
+        log.append(str(e))
+    except Exception as e:
+        log.append(f"!!! PROCESSING FAILED for {pdf_file.name}: {e} !!!")
 
-        except ValidationError as e:
-            print(f"!!! VALIDATION FAILED for {pdf_file.name} !!!")
-            print(e)
+    log.append("-" * (len(pdf_file.name) + 20))
+    return "\n".join(log)
 
-        print("-" * (len(pdf_file.name) + 20))
+def process_round1a_files(input_dir: str, output_dir: str, plan: Optional[ResourcePlan] = None):
+    input_path = Path(input_dir)
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+
+    if plan is None:
+        plan = configure_resources()
+
+    print(f"Processing files from: {input_path.resolve()}")
+    pdf_files = list(input_path.glob("*.pdf"))
+
+    if not pdf_files:
+        print("No PDF files found to process.")
+        return
+
+    # Each file is parsed in a worker process, gated by the memory budget;
+    # its log is printed as soon as it finishes
+    for pdf_file, future in map_documents(plan, partial(process_pdf_file, output_path=output_path), pdf_files):
+        try:
+            print(future.result())
+        except Exception as e:
+            print(f"!!! PROCESSING FAILED for {pdf_file.name}: {e} !!!")
 
 def run():
     INPUT_DIR = "input/round1a"
     OUTPUT_DIR = "output/round1a"
-    process_round1a_files(INPUT_DIR, OUTPUT_DIR)
+    plan = configure_resources()
+    process_round1a_files(INPUT_DIR, OUTPUT_DIR, plan)
 
 if __name__ == "__main__":
     run()
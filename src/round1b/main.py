@@ -1,11 +1,13 @@
 import json
 from pathlib import Path
 from datetime import datetime, timezone
+from typing import Optional
 
+from ..core.scheduler import ResourcePlan, configure_resources
 from ..schemas.output_schemas import Round1BInput, Round1BOutput
 from .relevance_analyzer import analyze_documents_for_persona
 
-def run_round1b(input_dir_path: Path, output_dir_path: Path, models_dir_path: Path):
+def run_round1b(input_dir_path: Path, output_dir_path: Path, models_dir_path: Path, plan: Optional[ResourcePlan] = None):
     """
     Main function to execute the Round 1B processing logic for a single collection.
     """
@@ -32,7 +34,8 @@ def run_round1b(input_dir_path: Path, output_dir_path: Path, models_dir_path: Pa
     analysis_result = analyze_documents_for_persona(
         pdf_paths=pdf_file_paths,
         persona=input_data.persona.role,
-        job=input_data.job_to_be_done.task
+        job=input_data.job_to_be_done.task,
+        plan=plan
     )
     
     # 5. Structure the final output
@@ -66,9 +69,12 @@ def run():
     
     # Ensure the output directory exists
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+
+    # Size threads, workers and batches to the container's CPU and memory limits
+    plan = configure_resources(uses_model=True)
     
     try:
-        run_round1b(INPUT_DIR, OUTPUT_DIR, MODELS_DIR)
+        run_round1b(INPUT_DIR, OUTPUT_DIR, MODELS_DIR, plan)
     except Exception as e:
         print(f"An error occurred during processing: {e}")
 
@@ -1,84 +1,76 @@
-from sentence_transformers import SentenceTransformer, util
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
-# IMPORTANT: Reuse your Round 1A logic and the detailed parser
-from ..round1a.outline_extractor import extract_outline_from_pdf
-from ..core.pdf_parser import extract_detailed_blocks
+from ..core.scheduler import ResourcePlan, configure_resources, map_documents
+from .section_parser import parse_document
 
 # --- Model Loading ---
 MODEL_PATH = "models/sentence-transformer-model"
-try:
-    model = SentenceTransformer(MODEL_PATH)
-    print("Sentence Transformer model loaded successfully.")
-except Exception as e:
-    print(f"Error loading model: {e}. Make sure you have downloaded the model to '{MODEL_PATH}'.")
-    model = None
+model = None
 
-# --- Configuration ---
-# Control how many top sections to return in the final output
-TOP_N_SECTIONS = 5 
-
-def get_text_after_heading(heading_block: Dict[str, Any], all_blocks: List[Dict[str, Any]]) -> str:
+def load_model():
     """
-    Finds and returns the text content that directly follows a heading block.
+    Loads the Sentence Transformer model on first use. Parsing workers
+    re-import the entry point, so importing this module must not pull in
+    sentence_transformers or the model weights.
     """
-    content = []
-    # Find all blocks on the same page that are positioned below the heading
-    for block in all_blocks:
-        if block['page'] == heading_block['page'] and block['bbox'][1] > heading_block['bbox'][3]:
-            # Simple heuristic: assume text within a certain vertical distance is part of the section
-            if block['bbox'][1] - heading_block['bbox'][3] < 50: # 50 pixels tolerance
-                 content.append(block['text'])
-    
-    # Join the found text and limit its length for a concise summary
-    full_text = " ".join(content)
-    return (full_text[:400] + '...') if len(full_text) > 400 else full_text
+    global model
+    if model is None:
+        from sentence_transformers import SentenceTransformer
+        try:
+            model = SentenceTransformer(MODEL_PATH)
+            print("Sentence Transformer model loaded successfully.")
+        except Exception as e:
+            print(f"Error loading model: {e}. Make sure you have downloaded the model to '{MODEL_PATH}'.")
+    return model
 
+# --- Configuration ---
+# Control how many top sections to return in the final output
+TOP_N_SECTIONS = 5 
 
-def analyze_documents_for_persona(pdf_paths: List[Path], persona: str, job: str) -> Dict[str, Any]:
+def analyze_documents_for_persona(pdf_paths: List[Path], persona: str, job: str, plan: Optional[ResourcePlan] = None) -> Dict[str, Any]:
     """
     Analyzes documents to find the TOP N sections most relevant to a persona and job.
     """
+    if plan is None:
+        plan = configure_resources(uses_model=True)
+
+    model = load_model()
     if model is None:
         raise RuntimeError("Sentence Transformer model is not available.")
 
-    # --- Step 1: Create a query from the persona and job description ---
-    query = f"As a {persona}, I need to {job}"
-    query_embedding = model.encode(query, convert_to_tensor=True)
-
-    # --- Step 2: Extract sections and create embeddings for all documents ---
-    all_sections = []
-    
-    # We need all text blocks from all documents for the subsection analysis later
-    all_docs_text_blocks = {}
-
+    # --- Step 1: Extract sections from all documents in worker processes ---
+    # Workers are started fresh (forkserver/spawn), so they do not inherit
+    # the loaded model or torch's thread pool from this process.
+    existing_paths = []
     for pdf_path in pdf_paths:
         if not pdf_path.exists():
             print(f"Warning: PDF file not found at {pdf_path}, skipping.")
             continue
-        
-        # Get all text blocks for subsection analysis
-        detailed_blocks, _ = extract_detailed_blocks(str(pdf_path))
-        all_docs_text_blocks[pdf_path.name] = detailed_blocks
+        existing_paths.append(pdf_path)
+
+    all_sections = []
+    for pdf_path, future in map_documents(plan, parse_document, existing_paths):
+        try:
+            all_sections.extend(future.result())
+        except Exception as e:
+            print(f"Warning: failed to parse {pdf_path.name}: {e}, skipping.")
+
+    # --- Step 2: Embed the query and all section headings in batches sized to the memory budget ---
+    from sentence_transformers import util
+
+    query = f"As a {persona}, I need to {job}"
+    query_embedding = model.encode(query, convert_to_tensor=True)
 
-        # Reuse your Round 1A outline extractor to find headings
-        outline_data = extract_outline_from_pdf(str(pdf_path))
-        
-        # Find the full block info for each heading identified by the outline extractor
-        for section_heading in outline_data.get("outline", []):
-            for block in detailed_blocks:
-                # Match the heading text and page to find the full block data
-                if section_heading['text'] == block['text'] and section_heading['page'] == block['page']:
-                    section_text = block["text"]
-                    section_embedding = model.encode(section_text, convert_to_tensor=True)
-                    similarity = util.cos_sim(query_embedding, section_embedding)
-                    
-                    # Store the full block info for later use
-                    block['relevance_score'] = similarity.item()
-                    block['document'] = pdf_path.name
-                    all_sections.append(block)
-                    break # Move to the next heading
+    if all_sections:
+        section_embeddings = model.encode(
+            [section["text"] for section in all_sections],
+            batch_size=plan.embedding_batch_size,
+            convert_to_tensor=True
+        )
+        similarities = util.cos_sim(query_embedding, section_embeddings)[0]
+        for section, similarity in zip(all_sections, similarities):
+            section['relevance_score'] = similarity.item()
 
     # --- Step 3: Rank sections and take the top N ---
     ranked_sections = sorted(all_sections, key=lambda x: x['relevance_score'], reverse=True)
@@ -87,8 +79,8 @@ def analyze_documents_for_persona(pdf_paths: List[Path], persona: str, job: str)
     # --- Step 4: Perform subsection analysis ONLY for the top sections ---
     subsection_data = []
     for section in top_sections:
-        # Get the full text content that follows the heading
-        refined_text = get_text_after_heading(section, all_docs_text_blocks[section['document']])
+        # The text following the heading was extracted by the parsing worker
+        refined_text = section["refined_text"]
         if refined_text: # Only add if we found some text
             subsection_data.append({
                 "document": section["document"],
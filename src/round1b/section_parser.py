@@ -0,0 +1,54 @@
+from pathlib import Path
+from typing import List, Dict, Any
+
+# IMPORTANT: Reuse your Round 1A logic and the detailed parser
+from ..round1a.outline_extractor import extract_outline_from_pdf
+from ..core.pdf_parser import extract_detailed_blocks
+
+# This module runs inside the parsing worker processes, so it must not
+# import the sentence transformer model or torch.
+
+def get_text_after_heading(heading_block: Dict[str, Any], all_blocks: List[Dict[str, Any]]) -> str:
+    """
+    Finds and returns the text content that directly follows a heading block.
+    """
+    content = []
+    # Find all blocks on the same page that are positioned below the heading
+    for block in all_blocks:
+        if block['page'] == heading_block['page'] and block['bbox'][1] > heading_block['bbox'][3]:
+            # Simple heuristic: assume text within a certain vertical distance is part of the section
+            if block['bbox'][1] - heading_block['bbox'][3] < 50: # 50 pixels tolerance
+                 content.append(block['text'])
+    
+    # Join the found text and limit its length for a concise summary
+    full_text = " ".join(content)
+    return (full_text[:400] + '...') if len(full_text) > 400 else full_text
+
+
+def parse_document(pdf_path: Path) -> List[Dict[str, Any]]:
+    """
+    Parses a single PDF in a worker process and returns the headings found by
+    the Round 1A outline extractor, each with the text that follows it. Only
+    these small records are sent back, so the full text blocks are freed when
+    the worker returns.
+    """
+    # Get all text blocks for subsection analysis
+    detailed_blocks, _ = extract_detailed_blocks(str(pdf_path))
+
+    # Reuse your Round 1A outline extractor to find headings
+    outline_data = extract_outline_from_pdf(str(pdf_path))
+
+    # Find the full block info for each heading identified by the outline extractor
+    sections = []
+    for section_heading in outline_data.get("outline", []):
+        for block in detailed_blocks:
+            # Match the heading text and page to find the full block data
+            if section_heading['text'] == block['text'] and section_heading['page'] == block['page']:
+                sections.append({
+                    "document": pdf_path.name,
+                    "text": block["text"],
+                    "page": block["page"],
+                    "refined_text": get_text_after_heading(block, detailed_blocks)
+                })
+                break # Move to the next heading
+    return sections
@@ -0,0 +1,237 @@
+import os
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from src.core import scheduler
+from src.core.scheduler import DOCUMENT_BASE_BYTES, DOCUMENT_SIZE_FACTOR, MIB, MemoryBudget
+
+
+@pytest.fixture
+def cgroup(tmp_path, monkeypatch):
+    """
+    Points the scheduler at an empty fake cgroup tree and returns a helper
+    that writes files into it.
+    """
+    monkeypatch.setattr(scheduler, "CGROUP_ROOT", tmp_path)
+    monkeypatch.delenv(scheduler.MEMORY_BUDGET_ENV, raising=False)
+    monkeypatch.delenv(scheduler.MAX_WORKERS_ENV, raising=False)
+
+    def write(name, content):
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content + "\n")
+
+    return write
+
+
+# --- cgroup parsing ---
+
+def test_no_cgroup_files_means_unlimited(cgroup):
+    assert scheduler.read_cgroup_cpu_limit() is None
+    assert scheduler.read_cgroup_memory_limit() is None
+
+
+def test_cgroup_v2_fractional_cpu_quota(cgroup):
+    cgroup("cpu.max", "150000 100000")
+    assert scheduler.read_cgroup_cpu_limit() == 1.5
+
+
+def test_cgroup_v2_unlimited(cgroup):
+    cgroup("cpu.max", "max 100000")
+    cgroup("memory.max", "max")
+    assert scheduler.read_cgroup_cpu_limit() is None
+    assert scheduler.read_cgroup_memory_limit() is None
+
+
+def test_cgroup_v2_memory_limit(cgroup):
+    cgroup("memory.max", str(2048 * MIB))
+    assert scheduler.read_cgroup_memory_limit() == 2048 * MIB
+
+
+def test_cgroup_v1_limits(cgroup):
+    cgroup("cpu/cpu.cfs_quota_us", "200000")
+    cgroup("cpu/cpu.cfs_period_us", "100000")
+    cgroup("memory/memory.limit_in_bytes", str(512 * MIB))
+    assert scheduler.read_cgroup_cpu_limit() == 2.0
+    assert scheduler.read_cgroup_memory_limit() == 512 * MIB
+
+
+def test_cgroup_v1_unlimited(cgroup):
+    cgroup("cpu/cpu.cfs_quota_us", "-1")
+    cgroup("cpu/cpu.cfs_period_us", "100000")
+    cgroup("memory/memory.limit_in_bytes", "9223372036854771712")
+    assert scheduler.read_cgroup_cpu_limit() is None
+    assert scheduler.read_cgroup_memory_limit() is None
+
+
+@pytest.mark.parametrize("cpu_max", ["garbage 100000", "100000 0", "100000 x"])
+def test_malformed_cpu_max_is_unknown(cgroup, cpu_max):
+    cgroup("cpu.max", cpu_max)
+    assert scheduler.read_cgroup_cpu_limit() is None
+
+
+def test_malformed_memory_max_is_unknown(cgroup):
+    cgroup("memory.max", "12x")
+    assert scheduler.read_cgroup_memory_limit() is None
+
+
+# --- plan arithmetic ---
+
+def test_plan_follows_container_limits(cgroup, monkeypatch):
+    monkeypatch.setattr(scheduler, "_host_cpu_count", lambda: 16)
+    cgroup("cpu.max", "250000 100000")
+    cgroup("memory.max", str(2048 * MIB))
+
+    plan = scheduler.plan_resources(uses_model=True)
+
+    assert plan.cpu_limit == 2.5
+    assert plan.torch_threads == 2
+    assert plan.parse_workers == 2
+    # 75% of 2 GiB minus the model reserve
+    assert plan.memory_budget.budget_bytes == 1536 * MIB - scheduler.MODEL_RESERVE_BYTES
+    assert plan.embedding_batch_size == 32
+
+
+def test_workers_are_bounded_by_memory_budget(cgroup, monkeypatch):
+    monkeypatch.setattr(scheduler, "_host_cpu_count", lambda: 16)
+    monkeypatch.setenv(scheduler.MEMORY_BUDGET_ENV, "96")
+
+    plan = scheduler.plan_resources()
+
+    assert plan.memory_budget.budget_bytes == 96 * MIB
+    assert plan.parse_workers == 96 * MIB // DOCUMENT_BASE_BYTES
+    assert plan.embedding_batch_size == 8
+
+
+def test_budget_never_drops_below_one_document(cgroup):
+    cgroup("memory.max", str(256 * MIB))
+    plan = scheduler.plan_resources(uses_model=True)
+    assert plan.memory_budget.budget_bytes == DOCUMENT_BASE_BYTES
+    assert plan.parse_workers == 1
+
+
+def test_max_workers_override(cgroup, monkeypatch):
+    monkeypatch.setattr(scheduler, "_host_cpu_count", lambda: 16)
+    monkeypatch.setenv(scheduler.MAX_WORKERS_ENV, "3")
+    assert scheduler.plan_resources().parse_workers == 3
+
+
+@pytest.mark.parametrize("value", ["1.5", "1g", "0", "-2"])
+def test_invalid_env_overrides_fall_back(cgroup, monkeypatch, capsys, value):
+    monkeypatch.setattr(scheduler, "_host_cpu_count", lambda: 4)
+    cgroup("memory.max", str(4096 * MIB))
+    monkeypatch.setenv(scheduler.MEMORY_BUDGET_ENV, value)
+    monkeypatch.setenv(scheduler.MAX_WORKERS_ENV, value)
+
+    plan = scheduler.plan_resources()
+
+    assert plan.memory_budget.budget_bytes == 3072 * MIB
+    assert plan.parse_workers == 4
+    output = capsys.readouterr().out
+    assert scheduler.MEMORY_BUDGET_ENV in output
+    assert scheduler.MAX_WORKERS_ENV in output
+
+
+# --- MemoryBudget ---
+
+def test_estimate_scales_with_file_size(tmp_path):
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"x" * 1024)
+    budget = MemoryBudget(1024 * MIB)
+    assert budget.estimate(pdf) == DOCUMENT_BASE_BYTES + 1024 * DOCUMENT_SIZE_FACTOR
+
+
+def test_estimate_is_clamped_to_budget(tmp_path):
+    pdf = tmp_path / "huge.pdf"
+    pdf.write_bytes(b"x" * (2 * MIB))
+    budget = MemoryBudget(DOCUMENT_BASE_BYTES)
+    assert budget.estimate(pdf) == DOCUMENT_BASE_BYTES
+
+    # An oversized document can still be reserved on its own
+    with budget.reserve(pdf):
+        pass
+
+
+def test_reserve_blocks_until_budget_is_released(tmp_path):
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"")
+    budget = MemoryBudget(DOCUMENT_BASE_BYTES)
+    second_entered = threading.Event()
+
+    def second_document():
+        with budget.reserve(pdf):
+            second_entered.set()
+
+    with budget.reserve(pdf):
+        worker = threading.Thread(target=second_document)
+        worker.start()
+        assert not second_entered.wait(timeout=0.2)
+
+    assert second_entered.wait(timeout=2)
+    worker.join()
+
+
+# --- map_documents ---
+
+def _parse_name(pdf_path):
+    if pdf_path.name == "broken.pdf":
+        raise ValueError("cannot parse")
+    if pdf_path.name == "killed.pdf":
+        # Simulates a worker being OOM-killed
+        os._exit(1)
+    if pdf_path.name == "slow.pdf":
+        time.sleep(1)
+    return pdf_path.name
+
+
+def _small_plan(workers):
+    plan = scheduler.plan_resources()
+    plan.parse_workers = workers
+    plan.memory_budget = MemoryBudget(workers * DOCUMENT_BASE_BYTES)
+    return plan
+
+
+def test_map_documents_returns_results_in_order(cgroup, tmp_path):
+    plan = _small_plan(workers=1)
+    paths = [tmp_path / name for name in ["a.pdf", "broken.pdf", "b.pdf"]]
+
+    results = list(scheduler.map_documents(plan, _parse_name, paths))
+
+    assert [path for path, _ in results] == paths
+    assert results[0][1].result() == "a.pdf"
+    assert results[2][1].result() == "b.pdf"
+    with pytest.raises(ValueError):
+        results[1][1].result()
+    # Every reservation is handed back once its worker returns
+    assert plan.memory_budget._in_use == 0
+
+
+def test_map_documents_streams_finished_documents(cgroup, tmp_path):
+    plan = _small_plan(workers=1)
+    paths = [tmp_path / name for name in ["a.pdf", "slow.pdf"]]
+
+    start = time.monotonic()
+    results = scheduler.map_documents(plan, _parse_name, paths)
+    path, future = next(results)
+
+    # The first document is handed back while the slow one is still running
+    assert time.monotonic() - start < 1
+    assert path == paths[0]
+    assert future.result() == "a.pdf"
+    assert [future.result() for _, future in results] == ["slow.pdf"]
+
+
+def test_map_documents_reports_broken_pool_per_document(cgroup, tmp_path):
+    plan = _small_plan(workers=1)
+    paths = [tmp_path / name for name in ["killed.pdf", "a.pdf", "b.pdf"]]
+
+    results = list(scheduler.map_documents(plan, _parse_name, paths))
+
+    assert [path for path, _ in results] == paths
+    for _, future in results:
+        with pytest.raises(BrokenProcessPool):
+            future.result()
+    assert plan.memory_budget._in_use == 0